@@ -1,13 +1,43 @@
+import argparse
+import sys
+from multiplexer import force_gpu_redetect
 from processing import clear_entry_info_cache, get_season_number, process_all_seasons
-from config import BILIBILI_VIDEO_FOLDER
+import config
 import message
 
 
-season_number = get_season_number()
-message.info(f"Processing anime as Season {season_number}")
+parser = argparse.ArgumentParser(
+    description="Process anime downloaded from the Bilibili app.")
+parser.add_argument(
+    "--redetect-gpu", action="store_true",
+    help="ignore the cached GPU detection result and probe the hardware again")
+parser.add_argument(
+    "--threadcount", type=int, default=config.SEASON_WORKERS,
+    help="number of season folders to process at once "
+         f"(default: {config.SEASON_WORKERS})")
+parser.add_argument(
+    "--reflink", action="store_true",
+    help="make copy-on-write copies of files instead of hardlinking them")
+parser.add_argument(
+    "--stage-media", action="store_true",
+    help="copy the audio and video files to the output folder "
+         "instead of muxing them from bilibili_video")
+args = parser.parse_args()
 
-# Process all seasons with the specified season number
-process_all_seasons(BILIBILI_VIDEO_FOLDER, season_number)
+if args.redetect_gpu:
+    force_gpu_redetect()
 
-# Clear cache when done
-clear_entry_info_cache()
\ No newline at end of file
+try:
+    season_number = get_season_number()
+    message.info("Processing anime as Season %d", season_number)
+
+    # Process all seasons with the specified season number
+    process_all_seasons(
+        config.BILIBILI_VIDEO_FOLDER, season_number, args.threadcount,
+        args.stage_media, args.reflink)
+
+    # Clear cache when done
+    clear_entry_info_cache()
+finally:
+    # Messages are not flushed one by one when output is redirected
+    sys.stdout.flush()
\ No newline at end of file
@@ -1,9 +1,32 @@
 import os
 
-# Base paths
-BASE_PATH = os.getcwd()
-BILIBILI_VIDEO_FOLDER = os.path.join(BASE_PATH, "bilibili_video")
-PROCESSED_MEDIA_DIR = os.path.join(BASE_PATH, "processed_media")
+# Base paths (BASE_PATH, BILIBILI_VIDEO_FOLDER, PROCESSED_MEDIA_DIR) are
+# resolved against the working directory on first access, see __getattr__
+BILIBILI_VIDEO_FOLDER_NAME = "bilibili_video"
+PROCESSED_MEDIA_DIR_NAME = "processed_media"
+
+_path_cache = {}
+
+
+def __getattr__(name):
+    """Resolve the working-directory based paths lazily (PEP 562)."""
+    if name not in _path_cache:
+        if name == "BASE_PATH":
+            _path_cache[name] = os.getcwd()
+        elif name == "BILIBILI_VIDEO_FOLDER":
+            _path_cache[name] = os.path.join(
+                __getattr__("BASE_PATH"), BILIBILI_VIDEO_FOLDER_NAME)
+        elif name == "PROCESSED_MEDIA_DIR":
+            _path_cache[name] = os.path.join(
+                __getattr__("BASE_PATH"), PROCESSED_MEDIA_DIR_NAME)
+        else:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return _path_cache[name]
+
+
+def clear_path_cache():
+    """Forget the resolved base paths, e.g. after changing directory."""
+    _path_cache.clear()
 
 # Folder structure constants
 ENTRY_JSON_FILENAME = "entry.json"
@@ -21,5 +44,24 @@ M4S_EXTENSION = ".m4s"
 MP4_EXTENSION = ".mp4"
 
 
+# Number of ffmpeg processes allowed to run at once
+MUX_WORKERS = min(os.cpu_count() or 1, 4)
+
+# Number of season folders prepared at once (--threadcount overrides it).
+# Preparing a season is mostly subtitle downloads and file copies, so the
+# workers are threads and spend their time waiting on I/O.
+SEASON_WORKERS = max(1, (os.cpu_count() or 1) // 2)
+
+# GPU detection cache
+GPU_CACHE_FILE = os.path.join(
+    os.path.expanduser("~"), ".cache", "bilibili_mux", "gpu.json")
+GPU_CACHE_TTL = 7 * 24 * 60 * 60  # Re-probe the hardware once a week
+FORCE_GPU_REDETECT_ENV = "BILIBILI_FORCE_GPU_REDETECT"
+
+# Subtitle downloads
+DOWNLOAD_TIMEOUT = 30  # Seconds to wait for the server
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_CONCURRENCY = 16  # Subtitle downloads in flight at once
+
 # Subtitle settings
 SUBTITLE_LANGUAGE_KEY = "en"  # Looking for English subtitles
\ No newline at end of file
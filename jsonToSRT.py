@@ -1,7 +1,6 @@
-import json
 import os
-from utils import format_srt_time, write_file
-from config import DEFAULT_ENCODING, JSON_EXTENSION, SRT_EXTENSION
+from utils import format_srt_time, parse_json, write_file
+from config import JSON_EXTENSION, SRT_EXTENSION
 import message
 
 def convert_json_to_srt(json_file_path, output_srt_path=None):
@@ -16,8 +15,8 @@ def convert_json_to_srt(json_file_path, output_srt_path=None):
         Path to the generated SRT file or None if conversion failed
     """
     try:
-        with open(json_file_path, encoding=DEFAULT_ENCODING) as f:
-            datas = json.load(f)
+        with open(json_file_path, 'rb') as f:
+            datas = parse_json(f.read())
 
         srt_content = ''
         for i, data in enumerate(datas['body'], start=1):
@@ -1,105 +1,175 @@
 """Message handling for the application."""
 
-
-def info(message):
+import os
+import sys
+import threading
+
+# Output levels: errors and warnings are shown from LEVEL_ERROR,
+# everything else from LEVEL_INFO, and the external commands being run from
+# LEVEL_DEBUG. Set BILIBILI_LOG=-1 to silence all output.
+LEVEL_ERROR = 0
+LEVEL_INFO = 1
+LEVEL_DEBUG = 2
+
+try:
+    LEVEL = int(os.environ.get("BILIBILI_LOG", LEVEL_INFO))
+except ValueError:
+    LEVEL = LEVEL_INFO
+
+# Pre-encoded message prefixes
+_INFO = b"[INFO] "
+_ERROR = b"[ERROR] "
+_SUCCESS = b"[SUCCESS] "
+_WARNING = b"[WARNING] "
+_PROCESSING = b"\n[PROCESSING] "
+_DEBUG = b"[DEBUG] "
+
+# Only flush every message when someone is watching the terminal;
+# redirected output is flushed by app.py on exit
+_INTERACTIVE = sys.stdout.isatty()
+
+# Seasons are processed from several threads; keep their lines whole
+_write_lock = threading.Lock()
+
+
+def enabled(level):
+    """Check whether messages of the given level are shown."""
+    return LEVEL >= level
+
+
+def _write(prefix, text, args=()):
+    """
+    Write one prefixed line to stdout with a single write call.
+
+    Like logging, text is only %-formatted with args here, once the
+    message is known to be shown.
+    """
+    if args:
+        text = text % args
+    stream = sys.stdout
+    encoding = getattr(stream, "encoding", None) or "utf-8"
+    data = prefix + str(text).encode(encoding, "replace") + b"\n"
+
+    buffer = getattr(stream, "buffer", None)
+    with _write_lock:
+        if buffer is None:
+            stream.write(data.decode(encoding))
+        else:
+            buffer.write(data)
+        if _INTERACTIVE:
+            stream.flush()
+
+
+def info(message, *args):
     """Display an informational message."""
-    print(f"[INFO] {message}")
+    if LEVEL >= LEVEL_INFO:
+        _write(_INFO, message, args)
 
 
-def error(message):
+def error(message, *args):
     """Display an error message."""
-    print(f"[ERROR] {message}")
+    if LEVEL >= LEVEL_ERROR:
+        _write(_ERROR, message, args)
 
 
-def success(message):
+def success(message, *args):
     """Display a success message."""
-    print(f"[SUCCESS] {message}")
+    if LEVEL >= LEVEL_INFO:
+        _write(_SUCCESS, message, args)
 
 
-def warning(message):
+def warning(message, *args):
     """Display a warning message."""
-    print(f"[WARNING] {message}")
+    if LEVEL >= LEVEL_ERROR:
+        _write(_WARNING, message, args)
+
+
+def debug(message, *args):
+    """Display a debug message."""
+    if LEVEL >= LEVEL_DEBUG:
+        _write(_DEBUG, message, args)
 
 
-def processing(item):
+def processing(item, *args):
     """Display a processing message."""
-    print(f"\n[PROCESSING] {item}")
+    if LEVEL >= LEVEL_INFO:
+        _write(_PROCESSING, item, args)
 
 
 # Subtitle related messages
 def subtitle_missing(title, ep_page_tag):
     """Display a message for missing subtitle."""
-    error(f"No English subtitle available for {title} - {ep_page_tag}")
+    error("No English subtitle available for %s - %s", title, ep_page_tag)
 
 
 def subtitle_download_success(title, ep_page_tag):
     """Display a message for successful subtitle download."""
-    success(f"Downloaded subtitle for {title} - {ep_page_tag}")
+    success("Downloaded subtitle for %s - %s", title, ep_page_tag)
 
 
 def subtitle_convert_success(path):
     """Display a message for successful subtitle conversion."""
-    success(f"Converted subtitle to SRT: {path}")
+    success("Converted subtitle to SRT: %s", path)
 
 
 def subtitle_process_failed(title, ep_page_tag):
     """Display a message for failed subtitle processing."""
     error(
-        f"Failed to download or convert subtitle for {title} - {ep_page_tag}")
+        "Failed to download or convert subtitle for %s - %s", title, ep_page_tag)
 
 
 # Folder and file related messages
 def folder_not_found(folder_type, path):
     """Display a message for folder not found."""
-    warning(f"No {folder_type} folder found in {path}")
+    warning("No %s folder found in %s", folder_type, path)
 
 
 def file_not_found(file_name, folder):
     """Display a message for file not found."""
-    warning(f"No {file_name} found in {folder}")
+    warning("No %s found in %s", file_name, folder)
 
 
 # Media processing messages
 def media_process_success(season_name):
     """Display a message for successful media processing."""
-    success(f"Processed media files for {season_name}")
+    success("Processed media files for %s", season_name)
 
 
 def media_files_missing(folder):
     """Display a message for missing media files."""
-    warning(f"Missing media files in {folder}")
+    warning("Missing media files in %s", folder)
 
 
 def media_copied(title, output_dir):
     """Display a message for copied media files."""
-    success(f"Copied media files for {title} to {output_dir}")
+    success("Copied media files for %s to %s", title, output_dir)
 
 
 # Season processing messages
 def season_processing(season_name):
     """Display a message for processing a season."""
-    processing(f"Episode folder: {season_name}")
+    processing("Episode folder: %s", season_name)
 
 
 # JSON to SRT conversion messages
 def json_to_srt_error(file_path, error_msg):
     """Display a message for JSON to SRT conversion error."""
-    error(f"Error converting {file_path} to SRT: {error_msg}")
+    error("Error converting %s to SRT: %s", file_path, error_msg)
 
 
 def json_to_srt_summary(count):
     """Display a summary of JSON to SRT conversion."""
-    info(f"Processed {count} JSON files to SRT format.")
+    info("Processed %d JSON files to SRT format.", count)
 
 
 def mkv_creation_started(title):
     """Display a message when MKV creation starts."""
-    info(f"Creating MKV file for {title}...")
+    info("Creating MKV file for %s...", title)
 
 def mkv_creation_success(path):
     """Display a message when MKV creation completes."""
-    success(f"Created MKV file: {path}")
+    success("Created MKV file: %s", path)
 
 def mkv_creation_error(error_text):
     """Display MKV creation error message."""
-    error(f"Error creating MKV file: {error_text}")
+    error("Error creating MKV file: %s", error_text)
@@ -5,94 +5,969 @@ Uses GPU acceleration when available.
 """
 
 import os
+import glob
+import shutil
 import subprocess
 import platform
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import message
-from config import SRT_EXTENSION, ASS_EXTENSION
+from utils import ensure_dir_exists, load_json, write_json
+from config import (
+    DEFAULT_ENCODING, SRT_EXTENSION, ASS_EXTENSION, GPU_CACHE_FILE,
+    GPU_CACHE_TTL, FORCE_GPU_REDETECT_ENV, MUX_WORKERS
+)
 
 # Global variable to store hardware acceleration information
-# Will be populated during module initialization
+# Populated on first use by get_hw_accel()
 HW_ACCEL = {
-    'type': 'cpu',     # Default to CPU
-    'hwaccel': None,   # Hardware acceleration option
-    'encoder': 'copy'  # Default to stream copy (no re-encoding)
+    'type': 'cpu',        # Default to CPU
+    'hwaccel': None,      # Hardware acceleration option
+    'decoder': None,      # Video decoder for the re-encode path (None = ffmpeg default)
+    'encoder': 'libx264'  # Video encoder for the re-encode path
 }
 
+# Whether detect_gpu() has run yet, guarded for concurrent muxing threads
+_hw_accel_detected = False
+# Set by force_gpu_redetect() to ignore the cached detection result
+_force_gpu_redetect = False
 
-def detect_gpu():
+# Trial decode results for HWACCEL_PROBED_CODECS, by codec
+_hw_decode_support = {}
+_hw_decode_lock = threading.Lock()
+_hw_accel_lock = threading.Lock()
+
+def _make_lang_metadata(lang_code):
+    """Build the (language=..., title=..., track name) strings for a language."""
+    track_name = f'{lang_code.upper()} Subtitle'
+    return (f'language={lang_code}', f'title={track_name}', track_name)
+
+
+# Subtitle metadata for the languages Bilibili commonly provides,
+# built once instead of for every subtitle of every episode
+LANG_METADATA = {
+    lang_code: _make_lang_metadata(lang_code)
+    for lang_code in ('en', 'vi', 'th', 'id', 'ms', 'ja', 'ko', 'zh-Hans', 'zh-Hant')
+}
+
+# mkvmerge (MKVToolNix) is used for stream-copy muxing when installed
+MKVMERGE_PATH = shutil.which('mkvmerge')
+
+# Start of every ffmpeg command: overwrite outputs, print errors only
+FFMPEG_BASE_CMD = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-nostats', '-y']
+
+# Codec options for a pure stream-copy remux
+REMUX_CODEC_ARGS = ['-c:v', 'copy', '-c:a', 'copy', '-c:s', 'copy']
+
+# Longest command line passed to a single ffmpeg process
+# (Windows CreateProcess accepts at most 32767 characters)
+MAX_COMMAND_LENGTH = 32 * 1024 - 1
+
+# ffmpeg hardware acceleration methods in order of preference,
+# each with the GPU type that has to be present to use it
+HWACCEL_PREFERENCE = ('cuda', 'amf', 'qsv', 'videotoolbox', 'vaapi')
+HWACCEL_GPU_TYPE = {
+    'cuda': 'nvidia',
+    'amf': 'amd',
+    'qsv': 'intel',
+    'videotoolbox': 'apple',
+    'vaapi': 'vaapi',
+}
+
+# Input options for the DASH video/audio files: their codec parameters are
+# in the MP4 header, so ffmpeg can skip its default stream analysis.
+# Subtitle inputs keep the defaults, which are needed to detect their format.
+FAST_INPUT_ARGS = [
+    '-fflags', '+fastseek', '-probesize', '32', '-analyzeduration', '0', '-threads', '0'
+]
+
+# Lines of muxer output kept for error messages
+OUTPUT_TAIL_LINES = 64
+
+# Frame format that keeps hardware-decoded frames in GPU memory
+HWACCEL_OUTPUT_FORMATS = {
+    'cuda': 'cuda',
+    'qsv': 'qsv',
+    'amf': 'd3d11',
+    'vaapi': 'vaapi',
+    'videotoolbox': 'videotoolbox_vld',
+}
+
+# Source codecs that only newer GPUs can decode; a one-frame trial decode
+# decides whether the hwaccel is used for them
+HWACCEL_PROBED_CODECS = ('av1',)
+
+# Encoders that only accept frames already in GPU memory
+HW_FRAME_ENCODERS = ('h264_vaapi',)
+
+# PCI vendor IDs as found in /sys/class/drm/card*/device/vendor
+PCI_VENDOR_IDS = {
+    '0x10de': 'nvidia',
+    '0x1002': 'amd',
+    '0x8086': 'intel',
+}
+
+# Windows display adapter class key and the ProviderName values to look for
+DISPLAY_CLASS_KEY = r"SYSTEM\CurrentControlSet\Control\Class\{4d36e968-e325-11ce-bfc1-08002be10318}"
+GPU_PROVIDER_NAMES = {
+    'nvidia': ['NVIDIA'],
+    'amd': ['AMD', 'Advanced Micro Devices'],
+    'intel': ['Intel'],
+}
+
+# Seconds to wait for the ffmpeg -hwaccels query
+GPU_PROBE_TIMEOUT = 3
+# Seconds to wait for a trial hardware decode (includes GPU initialisation)
+HW_DECODE_PROBE_TIMEOUT = 15
+
+# (decoder, encoder) pair used by the re-encode path for each GPU type
+HW_CODECS = {
+    'nvidia': ('h264_cuvid', 'h264_nvenc'),
+    'intel': ('h264_qsv', 'h264_qsv'),
+    'amd': (None, 'h264_amf'),
+    'apple': (None, 'h264_videotoolbox'),
+    'vaapi': (None, 'h264_vaapi'),
+}
+
+# Quality options for each video encoder (roughly visually lossless)
+ENCODER_OPTIONS = {
+    'libx264': ['-preset', 'veryfast', '-crf', '19'],
+    'h264_nvenc': ['-preset', 'p4', '-b:v', '0', '-cq', '19'],
+    'h264_qsv': ['-global_quality', '19'],
+    'h264_amf': ['-rc', 'cqp', '-qp_i', '19', '-qp_p', '19'],
+    'h264_videotoolbox': ['-q:v', '65'],
+    'h264_vaapi': ['-rc_mode', 'CQP', '-qp', '19'],
+}
+
+
+def _gpu_cache_key():
+    """Return the (system, node) pair a cached detection result belongs to."""
+    return [platform.system(), platform.node()]
+
+
+def _load_gpu_cache():
+    """
+    Load a previous GPU detection result from disk.
+
+    Returns:
+        dict: Cached HW_ACCEL values, or None if missing, stale or for another machine
+    """
+    cached = load_json(GPU_CACHE_FILE)
+    if not cached or cached.get('key') != _gpu_cache_key():
+        return None
+    if time.time() - cached.get('ts', 0) >= GPU_CACHE_TTL:
+        return None
+
+    hw_accel = cached.get('hw_accel')
+    if not isinstance(hw_accel, dict) or set(hw_accel) != set(HW_ACCEL):
+        return None
+    return hw_accel
+
+
+def _save_gpu_cache():
+    """Persist the current HW_ACCEL values so later runs can skip probing."""
+    try:
+        ensure_dir_exists(os.path.dirname(GPU_CACHE_FILE))
+        write_json(GPU_CACHE_FILE, {
+            'key': _gpu_cache_key(),
+            'ts': time.time(),
+            'hw_accel': HW_ACCEL
+        })
+    except OSError as e:
+        message.warning(f"Could not write GPU detection cache: {str(e)}")
+
+
+def force_gpu_redetect():
+    """Ignore the cached GPU detection result when the GPU is first needed."""
+    global _force_gpu_redetect
+    _force_gpu_redetect = True
+
+
+def detect_gpu(force=False):
     """
     Detect available GPUs for hardware acceleration.
 
+    The result is cached on disk for GPU_CACHE_TTL seconds; pass force, or
+    set the BILIBILI_FORCE_GPU_REDETECT=1 environment variable, to probe again.
+
+    Args:
+        force: Ignore the cached result
+
     Returns:
         dict: Hardware acceleration details with type and options
     """
-    global HW_ACCEL
-    system = platform.system()
-    
-    # Helper function to check for specific GPU type
-    def check_gpu(gpu_type, hwaccel, detection_configs):
-        """Check if a specific GPU type is available"""
-        for config in detection_configs:
-            platform_type, command, search_terms = config
-            
-            if platform_type != 'all' and platform_type != system:
-                continue
-                
-            try:
-                result = subprocess.run(
-                    command,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    timeout=5
-                )
-                
-                # Check if any of the search terms are in the output
-                if result.returncode == 0 and any(term in result.stdout for term in search_terms):
-                    HW_ACCEL['type'] = gpu_type
-                    HW_ACCEL['hwaccel'] = hwaccel
-                    message.info(f"{gpu_type.upper()} GPU detected - using {hwaccel.upper()} hardware acceleration")
-                    return True
-            except (subprocess.SubprocessError, FileNotFoundError):
-                pass
-                
-        return False
-    
-    # GPU detection configurations: [(platform, command, search_terms), ...]
-    gpu_configs = [
-        # NVIDIA detection
-        ('nvidia', 'cuda', [
-            ('Windows', ['nvidia-smi', '-L'], ['GPU']),
-            ('Linux', ['lspci'], ['NVIDIA'])
-        ]),
-        
-        # AMD detection
-        ('amd', 'amf', [
-            ('Windows', ['wmic', 'path', 'win32_VideoController', 'get', 'name'], ['AMD', 'Radeon']),
-            ('Linux', ['lspci'], ['AMD', 'Radeon'])
-        ]),
-        
-        # Intel detection
-        ('intel', 'qsv', [
-            ('Windows', ['wmic', 'path', 'win32_VideoController', 'get', 'name'], ['Intel', 'UHD', 'HD Graphics']),
-            ('Linux', ['lspci'], ['Intel'])
-        ])
-    ]
-    
-    # Try each GPU type in order of preference
-    for gpu_type, hwaccel, configs in gpu_configs:
-        if check_gpu(gpu_type, hwaccel, configs):
+    if not force and os.environ.get(FORCE_GPU_REDETECT_ENV) != '1':
+        cached = _load_gpu_cache()
+        if cached:
+            HW_ACCEL.update(cached)
+            message.info("Using cached GPU detection: %s", HW_ACCEL['type'].upper())
             return HW_ACCEL
-    
+
+    _probe_gpu()
+    _save_gpu_cache()
+    return HW_ACCEL
+
+
+def get_hw_accel():
+    """
+    Get the hardware acceleration details, detecting them on first use.
+
+    Only the re-encode path needs them, so a run that only remuxes never
+    probes the GPU at all.
+
+    Returns:
+        dict: Hardware acceleration details with type and options
+    """
+    global _hw_accel_detected
+    with _hw_accel_lock:
+        if not _hw_accel_detected:
+            detect_gpu(force=_force_gpu_redetect)
+            _hw_accel_detected = True
+    return HW_ACCEL
+
+
+def _use_hwaccel(hwaccel):
+    """Store the hardware acceleration settings for the given ffmpeg hwaccel."""
+    gpu_type = HWACCEL_GPU_TYPE[hwaccel]
+    HW_ACCEL['type'] = gpu_type
+    HW_ACCEL['hwaccel'] = hwaccel
+    HW_ACCEL['decoder'], HW_ACCEL['encoder'] = HW_CODECS[gpu_type]
+    message.info(
+        "%s GPU detected - using %s hardware acceleration", gpu_type.upper(), hwaccel.upper())
+
+
+def _probe_nvml():
+    """
+    Check for an NVIDIA GPU through NVML.
+
+    Requires the optional pynvml package.
+
+    Returns:
+        True if NVML reports at least one device, False otherwise
+    """
+    try:
+        import pynvml
+    except ImportError:
+        return False
+
+    try:
+        pynvml.nvmlInit()
+        try:
+            return pynvml.nvmlDeviceGetCount() > 0
+        finally:
+            pynvml.nvmlShutdown()
+    except pynvml.NVMLError:
+        return False
+
+
+def _probe_sysfs():
+    """
+    Read the PCI vendor IDs of the Linux DRM devices.
+
+    Returns:
+        Set of GPU types found
+    """
+    found = set()
+    for vendor_path in glob.glob('/sys/class/drm/card*/device/vendor'):
+        try:
+            with open(vendor_path, encoding=DEFAULT_ENCODING) as f:
+                vendor_id = f.read().strip().lower()
+        except OSError:
+            continue
+        if vendor_id in PCI_VENDOR_IDS:
+            found.add(PCI_VENDOR_IDS[vendor_id])
+    return found
+
+
+def _probe_windows_registry():
+    """
+    Read the display adapter providers from the Windows registry.
+
+    Returns:
+        Set of GPU types found
+    """
+    try:
+        import winreg
+    except ImportError:
+        return set()
+
+    found = set()
+    try:
+        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, DISPLAY_CLASS_KEY) as class_key:
+            index = 0
+            while True:
+                try:
+                    adapter_name = winreg.EnumKey(class_key, index)
+                except OSError:
+                    break  # No more subkeys
+                index += 1
+
+                try:
+                    with winreg.OpenKey(class_key, adapter_name) as adapter_key:
+                        provider, _ = winreg.QueryValueEx(adapter_key, 'ProviderName')
+                except OSError:
+                    continue  # Not an adapter entry (e.g. "Properties")
+
+                for gpu_type, terms in GPU_PROVIDER_NAMES.items():
+                    if any(term in provider for term in terms):
+                        found.add(gpu_type)
+    except OSError:
+        pass
+    return found
+
+
+def _probe_gpu_in_process():
+    """
+    Detect GPUs without spawning any subprocess.
+
+    Returns:
+        Set of GPU types found
+    """
+    found = {'nvidia'} if _probe_nvml() else set()
+
+    system = platform.system()
+    if system == 'Linux':
+        found |= _probe_sysfs()
+        # VA-API works with any vendor that exposes a render node
+        if glob.glob('/dev/dri/renderD*'):
+            found.add('vaapi')
+    elif system == 'Windows':
+        found |= _probe_windows_registry()
+    elif system == 'Darwin':
+        found.add('apple')
+    return found
+
+
+def _run_probe_command(command, timeout=GPU_PROBE_TIMEOUT):
+    """
+    Run a hardware probe command.
+
+    Args:
+        command: Tuple of command arguments
+        timeout: Seconds to wait before giving up
+
+    Returns:
+        The command's stdout, or None if it failed or timed out
+    """
+    try:
+        result = subprocess.run(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            errors='replace',
+            timeout=timeout,
+            # Don't allocate a console window for the probe on Windows
+            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+        )
+    except (subprocess.SubprocessError, FileNotFoundError):
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def _ffmpeg_hwaccels():
+    """
+    List the hardware acceleration methods the installed ffmpeg supports.
+
+    Returns:
+        Set of hwaccel names (e.g. {'cuda', 'vaapi'})
+    """
+    output = _run_probe_command(('ffmpeg', '-hide_banner', '-hwaccels'))
+    if not output:
+        return set()
+
+    # Methods are listed one per line after the header line
+    _, _, methods = output.partition('Hardware acceleration methods:')
+    return {line.strip() for line in methods.splitlines() if line.strip()}
+
+
+def _probe_gpu():
+    """
+    Probe the system for GPUs usable for hardware acceleration.
+
+    A hwaccel is only chosen when the installed ffmpeg supports it and the
+    matching hardware was found by the in-process probes, so the result is
+    always usable by the ffmpeg binary that does the re-encoding.
+
+    Returns:
+        dict: Hardware acceleration details with type and options
+    """
+    global HW_ACCEL
+
+    supported = _ffmpeg_hwaccels()
+    if supported:
+        found = _probe_gpu_in_process()
+        for hwaccel in HWACCEL_PREFERENCE:
+            if hwaccel in supported and HWACCEL_GPU_TYPE[hwaccel] in found:
+                _use_hwaccel(hwaccel)
+                return HW_ACCEL
+
     # If no GPU detected, default to CPU
     message.info("No GPU detected or suitable hardware acceleration found - using CPU")
     return HW_ACCEL
 
 
+def _probe_video_codec(video_path):
+    """
+    Get the codec of the first video stream with ffprobe.
+
+    Args:
+        video_path: Path to the video file
+
+    Returns:
+        Codec name (e.g. 'h264', 'hevc', 'av1') or None if it couldn't be read
+    """
+    output = _run_probe_command((
+        'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+        '-show_entries', 'stream=codec_name', '-of', 'csv=p=0', video_path
+    ))
+    return (output or '').strip() or None
+
+
+def _hw_decode_args():
+    """Build the -hwaccel options that decode into GPU memory."""
+    hw_accel = get_hw_accel()
+    args = ['-hwaccel', hw_accel['hwaccel']]
+
+    # Keep decoded frames in GPU memory instead of copying them back over PCIe
+    output_format = HWACCEL_OUTPUT_FORMATS.get(hw_accel['hwaccel'])
+    if output_format:
+        args.extend(['-hwaccel_output_format', output_format])
+    return args
+
+
+def _probe_hw_decode(video_path):
+    """
+    Check whether the GPU can decode a video by decoding its first frame.
+
+    Args:
+        video_path: Path to the video file
+
+    Returns:
+        True if the trial decode succeeded
+    """
+    command = (
+        'ffmpeg', '-hide_banner', '-v', 'error', *_hw_decode_args(),
+        '-i', video_path, '-frames:v', '1', '-f', 'null', '-'
+    )
+    return _run_probe_command(command, HW_DECODE_PROBE_TIMEOUT) is not None
+
+
+def _use_hwaccel_for(source_codec, video_path=None):
+    """
+    Check whether hardware decoding should be used for a source codec.
+
+    Codecs in HWACCEL_PROBED_CODECS are checked once per run with a trial
+    decode of video_path, since many GPUs that are otherwise supported have
+    no decoder for them.
+
+    Args:
+        source_codec: Codec of the source video, or None if unknown
+        video_path: Path to a video in source_codec, used for the trial decode
+
+    Returns:
+        True if a hwaccel is available and can decode the source
+    """
+    if not get_hw_accel()['hwaccel']:
+        return False
+    if source_codec not in HWACCEL_PROBED_CODECS:
+        return True
+
+    with _hw_decode_lock:
+        if source_codec not in _hw_decode_support:
+            if video_path is None:
+                return False
+            _hw_decode_support[source_codec] = _probe_hw_decode(video_path)
+            if not _hw_decode_support[source_codec]:
+                message.info(
+                    "GPU can't decode %s - decoding it on the CPU", source_codec.upper())
+        return _hw_decode_support[source_codec]
+
+
+def _hwaccel_args(video_codec, source_codec=None, video_path=None):
+    """
+    Build the hardware decode options for a given output video codec.
+
+    Hardware acceleration only applies to decoding, so nothing is returned
+    when the video stream is copied or the source can't be decoded on the GPU.
+
+    Args:
+        video_codec: The codec passed to -c:v for the output
+        source_codec: Codec of the source video, or None if unknown
+        video_path: Path to the video file, for the trial decode
+
+    Returns:
+        List of command arguments to place before the video input
+    """
+    hw_accel = get_hw_accel()
+    if video_codec == 'copy' or not _use_hwaccel_for(source_codec, video_path):
+        return []
+
+    args = _hw_decode_args()
+
+    # The dedicated decoders are H.264 only; let ffmpeg pick for anything else
+    if hw_accel['decoder'] and source_codec == 'h264':
+        args.extend(['-c:v', hw_accel['decoder']])
+    return args
+
+
+def _run_with_tail(command, from_stdout=False):
+    """
+    Run a command, keeping only the last lines of its diagnostic output.
+
+    The output is drained line by line while the command runs, so a long
+    log never piles up in memory; the other stream is discarded.
+
+    Args:
+        command: List of command arguments
+        from_stdout: Read stdout instead of stderr (mkvmerge reports there)
+
+    Returns:
+        Tuple of (return code, last OUTPUT_TAIL_LINES lines as bytes)
+    """
+    with subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE if from_stdout else subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL if from_stdout else subprocess.PIPE
+    ) as process:
+        tail = deque(
+            process.stdout if from_stdout else process.stderr,
+            maxlen=OUTPUT_TAIL_LINES)
+    return process.returncode, b''.join(tail)
+
+
+def _run_ffmpeg(command):
+    """
+    Run an ffmpeg command, streaming its stderr instead of buffering it.
+
+    Args:
+        command: List of command arguments
+
+    Returns:
+        Tuple of (return code, tail of stderr or empty string on success)
+    """
+    returncode, tail = _run_with_tail(command)
+    if returncode == 0:
+        return 0, ''
+
+    # ffmpeg may echo file names that are not valid UTF-8
+    return returncode, tail.decode(DEFAULT_ENCODING, errors='replace')
+
+
+def _lang_metadata(lang_code):
+    """
+    Get the metadata strings for a subtitle language.
+
+    Returns:
+        Tuple of (language=..., title=..., track name) strings
+    """
+    metadata = LANG_METADATA.get(lang_code)
+    if metadata is None:
+        metadata = _make_lang_metadata(lang_code)
+    return metadata
+
+
+def _subtitle_args(first_input, valid_subtitles):
+    """
+    Build the input, map and metadata options for the subtitles of one output.
+
+    Everything is built in a single pass over the subtitle list.
+
+    Args:
+        first_input: Input index of the first subtitle file
+        valid_subtitles: List of (lang_code, path) tuples for existing subtitles
+
+    Returns:
+        Tuple of (input args, map args, metadata args)
+    """
+    inputs = []
+    maps = []
+    metadata = []
+    for i, (lang_code, sub_path) in enumerate(valid_subtitles):
+        language_arg, title_arg, _ = _lang_metadata(lang_code)
+        stream = f'-metadata:s:s:{i}'
+        inputs.extend(['-i', sub_path])
+        maps.extend(['-map', f'{first_input+i}:s'])
+        metadata.extend([stream, language_arg, stream, title_arg])
+    return inputs, maps, metadata
+
+
+def _remux_job_args(first_input, video_path, audio_path, valid_subtitles, output_mkv_path):
+    """
+    Build the stream-copy options for one output file.
+
+    Args:
+        first_input: Input index of the video file; audio and subtitles follow it
+        video_path: Path to the video file
+        audio_path: Path to the audio file
+        valid_subtitles: List of (lang_code, path) tuples for existing subtitles
+        output_mkv_path: Path for the output MKV file
+
+    Returns:
+        Tuple of (input args, output args ending with the output path)
+    """
+    sub_inputs, sub_maps, sub_metadata = _subtitle_args(
+        first_input + 2, valid_subtitles)
+
+    inputs = [
+        *FAST_INPUT_ARGS, '-i', video_path,
+        *FAST_INPUT_ARGS, '-i', audio_path,
+        *sub_inputs
+    ]
+    outputs = [
+        '-map', f'{first_input}:v', '-map', f'{first_input+1}:a', *sub_maps,
+        *REMUX_CODEC_ARGS, *sub_metadata, output_mkv_path
+    ]
+    return inputs, outputs
+
+
+def _build_remux_cmd(video_path, audio_path, output_mkv_path, valid_subtitles):
+    """
+    Build the ffmpeg command for a pure stream-copy remux.
+
+    No hardware acceleration is requested here: with every stream copied,
+    ffmpeg never decodes a frame, so a hwaccel device would only be
+    initialised for nothing.
+
+    Args:
+        video_path: Path to the video file
+        audio_path: Path to the audio file
+        output_mkv_path: Path for the output MKV file
+        valid_subtitles: List of (lang_code, path) tuples for existing subtitles
+
+    Returns:
+        List of command arguments
+    """
+    inputs, outputs = _remux_job_args(
+        0, video_path, audio_path, valid_subtitles, output_mkv_path)
+    return [*FFMPEG_BASE_CMD, *inputs, *outputs]
+
+
+def _build_batch_remux_cmd(jobs):
+    """
+    Build one ffmpeg command that remuxes several episodes at once.
+
+    All inputs are declared first, then each output gets its own
+    -map/-c/-metadata block pointing at its inputs.
+
+    Args:
+        jobs: List of (video_path, audio_path, valid_subtitles, output_mkv_path) tuples
+
+    Returns:
+        List of command arguments
+    """
+    inputs = []
+    outputs = []
+    first_input = 0
+
+    for video_path, audio_path, valid_subtitles, output_mkv_path in jobs:
+        job_inputs, job_outputs = _remux_job_args(
+            first_input, video_path, audio_path, valid_subtitles, output_mkv_path)
+        inputs.extend(job_inputs)
+        outputs.extend(job_outputs)
+        first_input += 2 + len(valid_subtitles)
+
+    return [*FFMPEG_BASE_CMD, *inputs, *outputs]
+
+
+def _build_mkvmerge_cmd(video_path, audio_path, valid_subtitles, output_mkv_path, title=None):
+    """
+    Build the mkvmerge command for a pure stream-copy remux.
+
+    Args:
+        video_path: Path to the video file
+        audio_path: Path to the audio file
+        valid_subtitles: List of (lang_code, path) tuples for existing subtitles
+        output_mkv_path: Path for the output MKV file
+        title: The episode title stored as the container title
+
+    Returns:
+        List of command arguments
+    """
+    command = [MKVMERGE_PATH, '-o', output_mkv_path]
+    if title:
+        command.extend(['--title', title])
+
+    command.extend([video_path, '--language', '0:und', audio_path])
+
+    # Each subtitle file holds a single track with ID 0
+    for lang_code, sub_path in valid_subtitles:
+        command.extend([
+            '--language', f'0:{lang_code}',
+            '--track-name', f'0:{_lang_metadata(lang_code)[2]}',
+            sub_path
+        ])
+
+    return command
+
+
+def _mux_with_mkvmerge(video_path, audio_path, valid_subtitles, output_mkv_path, title=None):
+    """
+    Remux video, audio, and subtitles into an MKV file with mkvmerge.
+
+    Args:
+        video_path: Path to the video file
+        audio_path: Path to the audio file
+        valid_subtitles: List of (lang_code, path) tuples for existing subtitles
+        output_mkv_path: Path for the output MKV file
+        title: The episode title stored as the container title
+
+    Returns:
+        Path to the MKV file if successful, None otherwise
+    """
+    command = _build_mkvmerge_cmd(
+        video_path, audio_path, valid_subtitles, output_mkv_path, title)
+
+    # Debug: Print the full command
+    if message.enabled(message.LEVEL_DEBUG):
+        message.debug("mkvmerge command: %s", ' '.join(command))
+
+    # Output is kept as bytes and only decoded if it has to be reported
+    returncode, tail = _run_with_tail(command, from_stdout=True)
+
+    # mkvmerge exits with 1 when it only emitted warnings
+    if returncode in (0, 1) and os.path.exists(output_mkv_path):
+        message.mkv_creation_success(output_mkv_path)
+        _report_subtitles(valid_subtitles)
+        return output_mkv_path
+
+    # mkvmerge reports its errors on stdout
+    message.error(
+        f"mkvmerge error: {tail.decode(DEFAULT_ENCODING, errors='replace')}")
+    return None
+
+
+def _reencode_encoder(video_path):
+    """
+    Pick the encoder for a re-encode and probe the source codec it depends on.
+
+    Args:
+        video_path: Path to the video file
+
+    Returns:
+        Tuple of (encoder, source_codec); source_codec is None when not probed
+    """
+    hw_accel = get_hw_accel()
+    if not hw_accel['hwaccel']:
+        return hw_accel['encoder'], None
+
+    source_codec = _probe_video_codec(video_path)
+    encoder = hw_accel['encoder']
+    if encoder in HW_FRAME_ENCODERS and not _use_hwaccel_for(source_codec, video_path):
+        # This encoder only takes frames already in GPU memory
+        encoder = 'libx264'
+    return encoder, source_codec
+
+
+def _build_reencode_cmd(video_path, audio_path, output_mkv_path, valid_subtitles,
+                        encoder, source_codec=None):
+    """
+    Build the ffmpeg command that re-encodes the video stream.
+
+    Hardware encoders keep the frames on the GPU (NVDEC -> NVENC, QSV -> QSV,
+    ...); libx264 decodes and encodes on the CPU. Audio and subtitles are
+    still copied.
+
+    Args:
+        video_path: Path to the video file
+        audio_path: Path to the audio file
+        output_mkv_path: Path for the output MKV file
+        valid_subtitles: List of (lang_code, path) tuples for existing subtitles
+        encoder: Video encoder from _reencode_encoder
+        source_codec: Codec of the source video, or None if unknown
+
+    Returns:
+        List of command arguments
+    """
+    sub_inputs, sub_maps, sub_metadata = _subtitle_args(2, valid_subtitles)
+    hwaccel_args = (
+        _hwaccel_args(encoder, source_codec, video_path) if encoder != 'libx264' else [])
+
+    return [
+        *FFMPEG_BASE_CMD,
+        *hwaccel_args,
+        *FAST_INPUT_ARGS, '-i', video_path,
+        *FAST_INPUT_ARGS, '-i', audio_path,
+        *sub_inputs,
+        '-map', '0:v', '-map', '1:a', *sub_maps,
+        # Re-encode video, copy everything else
+        '-c:v', encoder, *ENCODER_OPTIONS.get(encoder, ()),
+        '-c:a', 'copy', '-c:s', 'copy',
+        *sub_metadata,
+        output_mkv_path
+    ]
+
+
+def _report_subtitles(valid_subtitles):
+    """Report which subtitle streams were added to an MKV file."""
+    if message.enabled(message.LEVEL_INFO):
+        message.info(
+            "Added %d subtitle streams: %s", len(valid_subtitles),
+            ', '.join(lang for lang, _ in valid_subtitles))
+
+
+def _valid_subtitles(subtitle_paths):
+    """
+    Keep only the subtitle files that exist.
+
+    Each path is checked exactly once; the command builders only ever
+    iterate the returned list, so they never touch the filesystem.
+
+    Args:
+        subtitle_paths: Dict of subtitle paths with language codes as keys
+
+    Returns:
+        List of (lang_code, path) tuples
+    """
+    valid_subtitles = []
+    if subtitle_paths and isinstance(subtitle_paths, dict):
+        for lang_code, sub_path in subtitle_paths.items():
+            if os.path.isfile(sub_path):
+                valid_subtitles.append((lang_code, sub_path))
+            else:
+                message.warning(f"Subtitle file not found: {sub_path}")
+    return valid_subtitles
+
+
+def _reencode(video_path, audio_path, valid_subtitles, output_mkv_path,
+              encoder, source_codec=None):
+    """
+    Run one re-encode attempt with the given encoder.
+
+    Args:
+        video_path: Path to the video file
+        audio_path: Path to the audio file
+        valid_subtitles: List of (lang_code, path) tuples for existing subtitles
+        output_mkv_path: Path for the output MKV file
+        encoder: Video encoder to use
+        source_codec: Codec of the source video, or None if unknown
+
+    Returns:
+        True if the MKV file was created, False otherwise
+    """
+    reencode_command = _build_reencode_cmd(
+        video_path, audio_path, output_mkv_path, valid_subtitles,
+        encoder, source_codec)
+
+    # Debug: Print the full command
+    if message.enabled(message.LEVEL_DEBUG):
+        message.debug("Re-encode FFmpeg command: %s", ' '.join(reencode_command))
+
+    reencode_returncode, reencode_stderr = _run_ffmpeg(reencode_command)
+
+    if reencode_returncode == 0 and os.path.exists(output_mkv_path):
+        message.mkv_creation_success(output_mkv_path)
+        _report_subtitles(valid_subtitles)
+        return True
+
+    message.error(f"Re-encode FFmpeg error: {reencode_stderr}")
+    return False
+
+
+def _mux_with_ffmpeg(video_path, audio_path, valid_subtitles, output_mkv_path):
+    """
+    Multiplex one episode with ffmpeg.
+
+    If the stream copy fails and hardware acceleration is available, the
+    video is re-encoded on the GPU, then once more with libx264 if that fails.
+
+    Args:
+        video_path: Path to the video file
+        audio_path: Path to the audio file
+        valid_subtitles: List of (lang_code, path) tuples for existing subtitles
+        output_mkv_path: Path for the output MKV file
+
+    Returns:
+        Path to the MKV file if successful, None otherwise
+    """
+    command = _build_remux_cmd(
+        video_path, audio_path, output_mkv_path, valid_subtitles)
+
+    # Debug: Print the full command
+    if message.enabled(message.LEVEL_DEBUG):
+        message.debug("FFmpeg command: %s", ' '.join(command))
+
+    # Run ffmpeg command
+    returncode, stderr = _run_ffmpeg(command)
+
+    if returncode == 0 and os.path.exists(output_mkv_path):
+        message.mkv_creation_success(output_mkv_path)
+        _report_subtitles(valid_subtitles)
+        return output_mkv_path
+    else:
+        message.error(f"FFmpeg error: {stderr}")
+
+        # Stream copy failed. Only re-encode on a GPU: a libx264 encode per
+        # episode is slow, and a bad audio or subtitle stream would fail again
+        if not get_hw_accel()['hwaccel']:
+            return None
+
+        encoder, source_codec = _reencode_encoder(video_path)
+        message.warning(
+            f"Stream copy failed. Re-encoding video with {encoder}...")
+        message.info("Using %s for re-encoding",
+                     'CPU' if encoder == 'libx264' else get_hw_accel()['type'].upper())
+        if _reencode(video_path, audio_path, valid_subtitles, output_mkv_path,
+                     encoder, source_codec):
+            return output_mkv_path
+
+        # GPU encoders can fail where libx264 works (driver mismatch,
+        # session limits, unsupported pixel formats), so retry once on the CPU
+        if encoder != 'libx264':
+            message.warning("Hardware acceleration failed. Retrying with CPU...")
+            if _reencode(video_path, audio_path, valid_subtitles, output_mkv_path,
+                         'libx264'):
+                return output_mkv_path
+
+        return None
+
+
+def _mux_episode(video_path, audio_path, valid_subtitles, output_mkv_path, title=None):
+    """
+    Multiplex one episode whose inputs are already validated.
+
+    mkvmerge is preferred for the stream copy when it is installed; if it is
+    missing or fails, ffmpeg muxes the same subtitles instead.
+
+    Args:
+        video_path: Path to the video file
+        audio_path: Path to the audio file
+        valid_subtitles: List of (lang_code, path) tuples for existing subtitles
+        output_mkv_path: Path for the output MKV file
+        title: The episode title (for messages and metadata)
+
+    Returns:
+        Path to the MKV file if successful, None otherwise
+    """
+    message.mkv_creation_started(title or os.path.basename(output_mkv_path))
+
+    if MKVMERGE_PATH:
+        try:
+            mkv_path = _mux_with_mkvmerge(
+                video_path, audio_path, valid_subtitles, output_mkv_path, title)
+        except Exception as e:
+            message.mkv_creation_error(str(e))
+            mkv_path = None
+        if mkv_path:
+            return mkv_path
+        message.warning("mkvmerge failed. Falling back to FFmpeg...")
+
+    try:
+        return _mux_with_ffmpeg(
+            video_path, audio_path, valid_subtitles, output_mkv_path)
+    except Exception as e:
+        message.mkv_creation_error(str(e))
+        return None
+
+
 def multiplex_to_mkv(video_path, audio_path, output_mkv_path, subtitle_paths=None, title=None):
     """
     Multiplex video, audio, and subtitles into a single MKV file.
-    Uses hardware acceleration when available.
+    Streams are copied as-is; if that fails the video is re-encoded,
+    but only when hardware acceleration is available.
 
     Args:
         video_path: Path to the video file
@@ -110,144 +985,157 @@ def multiplex_to_mkv(video_path, audio_path, output_mkv_path, subtitle_paths=Non
                 f"Video or audio file not found: {video_path}, {audio_path}")
             return None
 
-        # Use the globally detected hardware acceleration
-        global HW_ACCEL
+        # Track valid subtitle files and their languages
+        valid_subtitles = _valid_subtitles(subtitle_paths)
+    except Exception as e:
+        message.mkv_creation_error(str(e))
+        return None
 
-        # Prepare ffmpeg command
-        command = ['ffmpeg', '-y']  # Overwrite output file if it exists
+    return _mux_episode(
+        video_path, audio_path, valid_subtitles, output_mkv_path, title)
 
-        # Add hardware acceleration
-        if HW_ACCEL['hwaccel']:
-            command.extend(['-hwaccel', HW_ACCEL['hwaccel']])
 
-        # Add input files
-        command.extend(['-i', video_path, '-i', audio_path])
+def _run_fast(jobs, index, valid_subtitles):
+    """Run _mux_episode for one already-validated job, returning [(index, MKV path or None)]."""
+    video_path, audio_path, _, output_mkv_path, title = jobs[index]
+    return [(index, _mux_episode(
+        video_path, audio_path, valid_subtitles, output_mkv_path, title))]
 
-        # Track valid subtitle files and their languages
-        valid_subtitles = []
-
-        # Add subtitle inputs
-        if subtitle_paths and isinstance(subtitle_paths, dict):
-            for lang_code, sub_path in subtitle_paths.items():
-                if os.path.exists(sub_path):
-                    command.extend(['-i', sub_path])
-                    valid_subtitles.append((lang_code, sub_path))
-                else:
-                    message.warning(f"Subtitle file not found: {sub_path}")
-
-        # Map streams to output
-        command.append('-map')
-        command.append('0:v')  # Map video from first input
-        command.append('-map')
-        command.append('1:a')  # Map audio from second input
-
-        # Map all subtitle streams
-        for i in range(len(valid_subtitles)):
-            command.append('-map')
-            command.append(f'{i+2}:s')  # Map subtitles from their respective inputs
-
-        # Set codec options
-        command.extend([
-            '-c:v', 'copy',  # Copy video stream
-            '-c:a', 'copy',  # Copy audio stream
-            '-c:s', 'copy'   # Copy subtitle streams
-        ])
 
-        # Add subtitle metadata
-        for i, (lang_code, _) in enumerate(valid_subtitles):
-            command.extend([
-                f'-metadata:s:s:{i}', f'language={lang_code}',
-                f'-metadata:s:s:{i}', f'title={lang_code.upper()} Subtitle'
-            ])
+def _multiplex_job(job):
+    """Multiplex a single (video, audio, subtitles, output, title) job."""
+    video_path, audio_path, subtitle_paths, output_mkv_path, title = job
+    return multiplex_to_mkv(
+        video_path, audio_path, output_mkv_path, subtitle_paths, title)
 
-        # Add output file
-        command.append(output_mkv_path)
 
-        # Log the command
-        message.mkv_creation_started(
-            title or os.path.basename(output_mkv_path))
-        message.info(f"Using {HW_ACCEL['type'].upper()} for multiplexing")
-        
-        # Debug: Print the full command
-        message.info(f"FFmpeg command: {' '.join(command)}")
+def _split_batches(pending):
+    """
+    Split (job index, remux job) pairs into batches that fit on one command line.
 
-        # Run ffmpeg command
-        result = subprocess.run(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
+    Args:
+        pending: List of (index, (video_path, audio_path, valid_subtitles, output_mkv_path))
 
-        if result.returncode == 0 and os.path.exists(output_mkv_path):
-            message.mkv_creation_success(output_mkv_path)
-            message.info(f"Added {len(valid_subtitles)} subtitle streams: {', '.join(lang for lang, _ in valid_subtitles)}")
-            return output_mkv_path
+    Returns:
+        List of batches, each a list of the same pairs
+    """
+    batches = []
+    current = []
+    for item in pending:
+        command = _build_batch_remux_cmd([job for _, job in current + [item]])
+        if current and len(subprocess.list2cmdline(command)) > MAX_COMMAND_LENGTH:
+            batches.append(current)
+            current = [item]
         else:
-            message.error(f"FFmpeg error: {result.stderr}")
-
-            # Try again with basic command if it failed
-            if HW_ACCEL['type'] != 'cpu':
-                message.warning(
-                    "Hardware acceleration failed. Retrying with CPU...")
-                
-                # Build a simpler command still including all subtitles
-                basic_command = ['ffmpeg', '-y']
-                
-                # Add all inputs
-                basic_command.extend(['-i', video_path, '-i', audio_path])
-                
-                # Add subtitle inputs
-                for _, sub_path in valid_subtitles:
-                    basic_command.extend(['-i', sub_path])
-                
-                # Map streams
-                basic_command.append('-map')
-                basic_command.append('0:v')  # Map video
-                basic_command.append('-map')
-                basic_command.append('1:a')  # Map audio
-                
-                # Map all subtitle streams
-                for i in range(len(valid_subtitles)):
-                    basic_command.append('-map')
-                    basic_command.append(f'{i+2}:s')  # Map subtitles
-                
-                # Set codec options
-                basic_command.extend(['-c', 'copy'])
-                
-                # Add subtitle metadata
-                for i, (lang_code, _) in enumerate(valid_subtitles):
-                    basic_command.extend([
-                        f'-metadata:s:s:{i}', f'language={lang_code}',
-                        f'-metadata:s:s:{i}', f'title={lang_code.upper()} Subtitle'
-                    ])
-                
-                # Add output file
-                basic_command.append(output_mkv_path)
-                
-                # Debug: Print the full command
-                message.info(f"Basic FFmpeg command: {' '.join(basic_command)}")
-
-                basic_result = subprocess.run(
-                    basic_command,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True
-                )
-
-                if basic_result.returncode == 0 and os.path.exists(output_mkv_path):
-                    message.mkv_creation_success(output_mkv_path)
-                    message.info(f"Added {len(valid_subtitles)} subtitle streams: {', '.join(lang for lang, _ in valid_subtitles)}")
-                    return output_mkv_path
-                else:
-                    message.error(f"Basic FFmpeg error: {basic_result.stderr}")
+            current.append(item)
+    if current:
+        batches.append(current)
+    return batches
 
-            return None
 
+def _run_batch(jobs, batch):
+    """
+    Remux one batch with a single ffmpeg process.
+
+    Args:
+        jobs: The full job list passed to multiplex_batch
+        batch: List of (index, remux job) pairs from _split_batches
+
+    Returns:
+        List of (index, MKV path or None) pairs
+    """
+    # A single episode gains nothing from batching
+    if len(batch) == 1:
+        index = batch[0][0]
+        return [(index, _multiplex_job(jobs[index]))]
+
+    command = _build_batch_remux_cmd([job for _, job in batch])
+
+    for index, (_, _, _, output_mkv_path) in batch:
+        message.mkv_creation_started(
+            jobs[index][4] or os.path.basename(output_mkv_path))
+
+    # Debug: Print the full command
+    if message.enabled(message.LEVEL_DEBUG):
+        message.debug("Batch FFmpeg command: %s", ' '.join(command))
+
+    try:
+        returncode, stderr = _run_ffmpeg(command)
     except Exception as e:
         message.mkv_creation_error(str(e))
-        return None
+        returncode, stderr = None, ''
+
+    if returncode == 0 and all(
+            os.path.exists(output_mkv_path) for _, (_, _, _, output_mkv_path) in batch):
+        for _, (_, _, valid_subtitles, output_mkv_path) in batch:
+            message.mkv_creation_success(output_mkv_path)
+            _report_subtitles(valid_subtitles)
+        return [(index, job[3]) for index, job in batch]
+
+    if stderr:
+        message.error(f"Batch FFmpeg error: {stderr}")
+    message.warning("Batch multiplexing failed. Retrying episode by episode...")
+    return [(index, _multiplex_job(jobs[index])) for index, _ in batch]
+
+
+def multiplex_batch(jobs, max_workers=MUX_WORKERS):
+    """
+    Multiplex several episodes with as few ffmpeg processes as possible.
+
+    The episodes are spread over up to max_workers batches that run
+    concurrently; each batch is a single ffmpeg process, so start-up is
+    paid once per batch instead of once per episode. Batches whose command
+    line would exceed MAX_COMMAND_LENGTH are split, and any batch that
+    fails is retried episode by episode with multiplex_to_mkv (which also
+    handles the re-encode fallback). When mkvmerge is installed the
+    episodes skip ffmpeg entirely and are remuxed by mkvmerge instead.
+
+    Args:
+        jobs: List of (video_path, audio_path, subtitle_paths, output_mkv_path, title) tuples
+        max_workers: Maximum number of ffmpeg processes running at once
+
+    Returns:
+        List with the MKV path (or None on failure) for each job, in order
+    """
+    results = [None] * len(jobs)
+
+    # Validate inputs up front so one bad episode doesn't sink the batch,
+    # keeping (job index, remux job) pairs for the ones that can be muxed
+    pending = []
+    fast = []
+    for index, (video_path, audio_path, subtitle_paths, output_mkv_path, _) in enumerate(jobs):
+        if not (video_path and audio_path
+                and os.path.exists(video_path) and os.path.exists(audio_path)):
+            message.error(
+                f"Video or audio file not found: {video_path}, {audio_path}")
+            continue
+        valid_subtitles = _valid_subtitles(subtitle_paths)
+        if MKVMERGE_PATH:
+            # Every stream is copied, so mkvmerge can take the whole job
+            fast.append((index, valid_subtitles))
+        else:
+            pending.append(
+                (index, (video_path, audio_path, valid_subtitles, output_mkv_path)))
+
+    if not pending and not fast:
+        return results
+
+    # Spread the episodes evenly over the workers
+    workers = max(1, min(max_workers, len(pending) + len(fast)))
+    tasks = []
+    if pending:
+        group_size = -(-len(pending) // workers)  # Ceiling division
+        for start in range(0, len(pending), group_size):
+            for batch in _split_batches(pending[start:start + group_size]):
+                tasks.append(partial(_run_batch, jobs, batch))
+    for index, valid_subtitles in fast:
+        tasks.append(partial(_run_fast, jobs, index, valid_subtitles))
+
+    # The muxers do the work, so threads are enough to keep several running
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for task_results in executor.map(lambda task: task(), tasks):
+            for index, mkv_path in task_results:
+                results[index] = mkv_path
 
+    return results
 
-# Detect GPU capabilities when the module is loaded
-detect_gpu()
@@ -4,17 +4,150 @@ Handles extraction, organization, and processing of video, audio, and subtitle f
 """
 
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from utils import (
     ensure_dir_exists, copy_file_with_new_name, create_metadata_file,
-    extract_info_from_entry_json, format_tv_style_filename
+    extract_info_from_entry_json, format_tv_style_filename, clear_entry_json_cache,
+    download_files
 )
 from config import *
+import config
 import message
 from jsonToSRT import convert_json_to_srt
-from multiplexer import multiplex_to_mkv
+from multiplexer import multiplex_batch, multiplex_to_mkv
 
 
-_entry_info_cache = {}
+# Folder names that usually hold subtitles when entry.json doesn't say
+COMMON_SUBTITLE_FOLDERS = frozenset(['vi', 'subtitle', 'subtitles', 'sub', 'subs'])
+
+# Folders created by the OS or a NAS that are never searched for seasons
+SKIPPED_FOLDERS = frozenset([
+    '@eaDir', '#recycle', '$RECYCLE.BIN', 'System Volume Information', '__MACOSX'
+])
+
+
+@lru_cache(maxsize=256)
+def _scan_entries(directory):
+    """
+    List the entries of a source directory with a single scandir call.
+
+    Only meant for the bilibili_video tree, which doesn't change while it is
+    being processed; the cache is cleared by clear_entry_info_cache.
+
+    Args:
+        directory: Directory to list
+
+    Returns:
+        Tuple of (name, is_dir) pairs, empty if the directory can't be read.
+        Symlinks are not followed, so a symlinked folder is not a folder.
+    """
+    try:
+        with os.scandir(directory) as entries:
+            return tuple(
+                (entry.name, entry.is_dir(follow_symlinks=False)) for entry in entries)
+    except OSError:
+        return ()
+
+
+@lru_cache(maxsize=256)
+def _scan(directory):
+    """
+    Get the entry names of a source directory for fast membership checks.
+
+    Args:
+        directory: Directory to list
+
+    Returns:
+        Frozenset of entry names, empty if the directory can't be read
+    """
+    return frozenset(name for name, _ in _scan_entries(directory))
+
+
+def _subfolders(directory):
+    """
+    Get the folders of a source directory that may hold episodes.
+
+    Hidden and system folders never hold episodes and are left out.
+
+    Args:
+        directory: Directory to list
+
+    Returns:
+        List of subfolder paths
+    """
+    return [
+        os.path.join(directory, name) for name, is_dir in _scan_entries(directory)
+        if is_dir and not name.startswith('.') and name not in SKIPPED_FOLDERS
+    ]
+
+
+# English subtitle paths whose download failed in prefetch_en_subtitles
+_failed_en_subtitles = set()
+
+
+def _subtitle_url_extension(subtitle_url):
+    """Get the subtitle file extension (JSON or ASS) from its URL."""
+    return JSON_EXTENSION if '.json' in subtitle_url.lower() else ASS_EXTENSION
+
+
+def _en_subtitle_path(entry_info, season_number, output_base_filename=None):
+    """
+    Get where the English subtitle of an episode is downloaded to.
+
+    Args:
+        entry_info: Dictionary with episode information
+        season_number: Season number for TV style naming
+        output_base_filename: Optional custom base filename (defaults to TV style format)
+
+    Returns:
+        Path to the downloaded subtitle file (JSON or ASS, as served)
+    """
+    if not output_base_filename:
+        output_base_filename = format_tv_style_filename(
+            entry_info.get('title', 'Unknown'), season_number,
+            entry_info.get('episode_tag', ''))
+    extension = _subtitle_url_extension(entry_info.get('subtitle_url', ''))
+    return os.path.join(
+        config.PROCESSED_MEDIA_DIR, f"{output_base_filename}.en{extension}")
+
+
+def prefetch_en_subtitles(season_folders, season_number):
+    """
+    Download the English subtitles of several season folders concurrently.
+
+    The files are saved where download_en_subtitle looks for them, so it
+    only has to convert them afterwards. Failed downloads are recorded so
+    download_en_subtitle reports them without trying again.
+
+    Args:
+        season_folders: List of season folder paths
+        season_number: Season number for TV style naming
+
+    Returns:
+        None
+    """
+    downloads = []
+    for season_folder in season_folders:
+        if ENTRY_JSON_FILENAME not in _scan(season_folder):
+            continue
+        entry_info = extract_info_from_entry_json(
+            os.path.join(season_folder, ENTRY_JSON_FILENAME))
+        subtitle_url = entry_info.get('subtitle_url', '')
+        if not subtitle_url:
+            continue
+
+        subtitle_file_path = _en_subtitle_path(entry_info, season_number)
+        if not os.path.exists(subtitle_file_path):
+            downloads.append((subtitle_url, subtitle_file_path))
+
+    if downloads:
+        ensure_dir_exists(config.PROCESSED_MEDIA_DIR)
+        message.info("Downloading %d English subtitles", len(downloads))
+        results = download_files(downloads)
+        _failed_en_subtitles.update(
+            save_path for (_, save_path), result in zip(downloads, results) if not result)
 
 
 def download_en_subtitle(entry_info, season_number, output_base_filename=None):
@@ -38,22 +171,21 @@ def download_en_subtitle(entry_info, season_number, output_base_filename=None):
         return None
 
     # Create output directory
-    ensure_dir_exists(PROCESSED_MEDIA_DIR)
-
-    # Format file name
-    if not output_base_filename:
-        output_base_filename = format_tv_style_filename(
-            title, season_number, episode_tag)
+    ensure_dir_exists(config.PROCESSED_MEDIA_DIR)
 
     # Determine extension from URL
-    extension = JSON_EXTENSION if '.json' in subtitle_url.lower() else ASS_EXTENSION
+    extension = _subtitle_url_extension(subtitle_url)
     lang_extension = f".en{extension}"
 
-    # Download subtitle file
-    subtitle_file_path = os.path.join(
-        PROCESSED_MEDIA_DIR, f"{output_base_filename}{lang_extension}")
+    # Download subtitle file (unless prefetch_en_subtitles already did)
+    subtitle_file_path = _en_subtitle_path(
+        entry_info, season_number, output_base_filename)
 
     if not os.path.exists(subtitle_file_path):
+        # The prefetch already reported why this one failed
+        if subtitle_file_path in _failed_en_subtitles:
+            message.subtitle_process_failed(title, episode_tag)
+            return None
         from utils import download_file
         if not download_file(subtitle_url, subtitle_file_path):
             message.subtitle_process_failed(title, episode_tag)
@@ -72,7 +204,40 @@ def download_en_subtitle(entry_info, season_number, output_base_filename=None):
     return subtitle_file_path
 
 
-def process_local_subtitle(season_folder, entry_info, season_number, output_base_filename=None):
+def _process_one_subtitle(item, reflink=False):
+    """
+    Copy one local subtitle file to the output folder, converting JSON to SRT.
+
+    Args:
+        item: Tuple of (source path, output path, extension, subtitle folder name)
+        reflink: Make a copy-on-write copy instead of a hardlink
+
+    Returns:
+        Path to the usable subtitle file or None if the conversion failed
+    """
+    source_path, output_path, extension, folder_name = item
+
+    # Copy if it doesn't exist (normally a hardlink, so no data is read)
+    if not os.path.exists(output_path):
+        copy_file_with_new_name(
+            source_path, config.PROCESSED_MEDIA_DIR, os.path.basename(output_path),
+            reflink=reflink)
+        message.info(
+            "Copied %s subtitle from %s: %s", extension, folder_name, output_path)
+
+    if extension != JSON_EXTENSION:
+        return output_path
+
+    # Convert JSON to SRT straight from the source file
+    srt_path = output_path.replace(JSON_EXTENSION, SRT_EXTENSION)
+    if convert_json_to_srt(source_path, srt_path):
+        message.subtitle_convert_success(srt_path)
+        return srt_path
+    return None
+
+
+def process_local_subtitle(season_folder, entry_info, season_number, output_base_filename=None,
+                           reflink=False):
     """
     Process local subtitle files found in the subtitle folder specified in entry.json.
 
@@ -81,6 +246,7 @@ def process_local_subtitle(season_folder, entry_info, season_number, output_base
         entry_info: Dictionary with episode information
         season_number: Season number for TV style naming
         output_base_filename: Optional custom base filename (defaults to TV style format)
+        reflink: Make copy-on-write copies instead of hardlinks
 
     Returns:
         Dictionary of subtitle paths by language code
@@ -107,34 +273,45 @@ def process_local_subtitle(season_folder, entry_info, season_number, output_base
             title, season_number, episode_tag)
 
     # Create output directory
-    ensure_dir_exists(PROCESSED_MEDIA_DIR)
+    ensure_dir_exists(config.PROCESSED_MEDIA_DIR)
+
+    # Sort the subtitle files by extension in a single directory pass
+    files_by_extension = {JSON_EXTENSION: [], ASS_EXTENSION: []}
+    with os.scandir(local_subtitle_folder) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.endswith(JSON_EXTENSION):
+                extension = JSON_EXTENSION
+            elif name.endswith(ASS_EXTENSION):
+                extension = ASS_EXTENSION
+            else:
+                continue
+            if entry.is_file():
+                files_by_extension[extension].append(entry.path)
+
+    # Every file of one extension maps to the same output name, and only the
+    # first one was ever copied there, so there is one item per extension
+    output_prefix = os.path.join(
+        config.PROCESSED_MEDIA_DIR, f"{output_base_filename}.{subtitle_lang}")
+    items = [
+        (source_paths[0], output_prefix + extension,
+         extension, local_subtitle_folder_name)
+        for extension, source_paths in files_by_extension.items() if source_paths
+    ]
+
+    # Copy and convert the formats concurrently
+    process_one = partial(_process_one_subtitle, reflink=reflink)
+    if len(items) > 1:
+        with ThreadPoolExecutor(max_workers=len(items)) as executor:
+            results = list(executor.map(process_one, items))
+    else:
+        results = [process_one(item) for item in items]
 
+    # ASS is processed last so it is preferred over a converted JSON file
     subtitle_paths = {}
-
-    # Process subtitle files
-    for extension in (JSON_EXTENSION, ASS_EXTENSION):
-        subtitle_files = [f for f in os.listdir(
-            local_subtitle_folder) if f.endswith(extension)]
-        for subtitle_file in subtitle_files:
-            source_path = os.path.join(local_subtitle_folder, subtitle_file)
-            dest_filename = f"{output_base_filename}.{subtitle_lang}{extension}"
-            output_path = os.path.join(PROCESSED_MEDIA_DIR, dest_filename)
-
-            # Copy if it doesn't exist
-            if not os.path.exists(output_path):
-                copy_file_with_new_name(
-                    source_path, PROCESSED_MEDIA_DIR, dest_filename)
-                message.info(
-                    f"Copied {extension} subtitle from {local_subtitle_folder_name}: {output_path}")
-
-            # Convert JSON to SRT
-            if extension == JSON_EXTENSION:
-                srt_path = output_path.replace(JSON_EXTENSION, SRT_EXTENSION)
-                if convert_json_to_srt(output_path, srt_path):
-                    message.subtitle_convert_success(srt_path)
-                    subtitle_paths[subtitle_lang] = srt_path
-            else:
-                subtitle_paths[subtitle_lang] = output_path
+    for path in results:
+        if path:
+            subtitle_paths[subtitle_lang] = path
 
     return subtitle_paths
 
@@ -150,12 +327,12 @@ def find_subtitle_files(base_filename):
         Dictionary of subtitle paths by language code
     """
     subtitle_paths = {}
+    base_path = os.path.join(config.PROCESSED_MEDIA_DIR, base_filename)
 
     # Check for English subtitle (downloaded)
     for lang, prefix in [('en', '.en'), ('vi', '.vi')]:
         for ext in (SRT_EXTENSION, ASS_EXTENSION):
-            path = os.path.join(PROCESSED_MEDIA_DIR,
-                                f"{base_filename}{prefix}{ext}")
+            path = f"{base_path}{prefix}{ext}"
             if os.path.exists(path):
                 subtitle_paths[lang] = path
                 break
@@ -163,14 +340,22 @@ def find_subtitle_files(base_filename):
     return subtitle_paths
 
 
-def process_media_files(season_folder, entry_info, season_number=1):
+def process_media_files(season_folder, entry_info, season_number=1, multiplex=True,
+                        stage_media=False, reflink=False):
     """
     Process media files and create MKV with video, audio, and subtitles.
 
+    The muxer only copies streams, so it reads the original audio/video
+    files unless stage_media asks for renamed copies in the output folder.
+
     Args:
         season_folder: Path to the season folder
         entry_info: Dictionary with episode information (pre-loaded)
         season_number: Season number for TV style naming
+        multiplex: Create the MKV and metadata file now; when False the caller
+            is expected to pass the result to multiplex_media_batch
+        stage_media: Copy the audio/video files into PROCESSED_MEDIA_DIR first
+        reflink: Make copy-on-write copies instead of hardlinks
 
     Returns:
         Dictionary with paths to processed files or None if processing failed
@@ -187,18 +372,19 @@ def process_media_files(season_folder, entry_info, season_number=1):
 
     # Find media folder
     media_folder = os.path.join(season_folder, prefered_video_quality)
-    if not os.path.exists(media_folder):
+    if prefered_video_quality not in _scan(season_folder):
         message.folder_not_found(
             f"video quality folder ({prefered_video_quality})", season_folder)
         return None
 
     # Create output folder
-    ensure_dir_exists(PROCESSED_MEDIA_DIR)
+    ensure_dir_exists(config.PROCESSED_MEDIA_DIR)
 
     # Check for source files
     audio_path = os.path.join(media_folder, AUDIO_FILENAME)
     video_path = os.path.join(media_folder, VIDEO_FILENAME)
-    if not (os.path.exists(audio_path) and os.path.exists(video_path)):
+    media_files = _scan(media_folder)
+    if not (AUDIO_FILENAME in media_files and VIDEO_FILENAME in media_files):
         message.media_files_missing(media_folder)
         return None
 
@@ -208,61 +394,119 @@ def process_media_files(season_folder, entry_info, season_number=1):
 
     # Process files
     try:
-        # Copy media files
-        output_audio_filename = f"{tv_style_filename}_{AUDIO_FILENAME}"
-        output_video_filename = f"{tv_style_filename}_{VIDEO_FILENAME}"
-
-        output_audio_path = copy_file_with_new_name(
-            audio_path, PROCESSED_MEDIA_DIR, output_audio_filename)
-        output_video_path = copy_file_with_new_name(
-            video_path, PROCESSED_MEDIA_DIR, output_video_filename)
-
-        if output_audio_path and output_video_path:
-            message.media_copied(title, PROCESSED_MEDIA_DIR)
+        output_audio_path = audio_path
+        output_video_path = video_path
+
+        # Copy media files only when asked to
+        if stage_media:
+            output_audio_filename = f"{tv_style_filename}_{AUDIO_FILENAME}"
+            output_video_filename = f"{tv_style_filename}_{VIDEO_FILENAME}"
+
+            # Copy both files at once; the copies run in the kernel and
+            # release the GIL, so the two transfers overlap
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                audio_copy = executor.submit(
+                    copy_file_with_new_name,
+                    audio_path, config.PROCESSED_MEDIA_DIR, output_audio_filename,
+                    reflink=reflink)
+                video_copy = executor.submit(
+                    copy_file_with_new_name,
+                    video_path, config.PROCESSED_MEDIA_DIR, output_video_filename,
+                    reflink=reflink)
+            output_audio_path = audio_copy.result()
+            output_video_path = video_copy.result()
+
+            # copy_file_with_new_name has already reported the error
+            if not (output_audio_path and output_video_path):
+                return None
+            message.media_copied(title, config.PROCESSED_MEDIA_DIR)
 
         # Find or create subtitle files
         subtitle_paths = find_subtitle_files(tv_style_filename)
 
+        media = {
+            'audio': output_audio_path,
+            'video': output_video_path,
+            'mkv': None,
+            'metadata': os.path.join(
+                config.PROCESSED_MEDIA_DIR, f"{tv_style_filename}_metadata.txt"),
+            'subtitles': subtitle_paths,
+            'quality': prefered_video_quality,
+            'title': title,
+            'season_number': season_number,
+            'episode_tag': episode_tag,
+            'source_folder': season_folder,
+            'output_mkv': os.path.join(
+                config.PROCESSED_MEDIA_DIR, f"{tv_style_filename}.mkv")
+        }
+
+        if not multiplex:
+            return media
+
         # Create MKV
-        output_mkv_path = os.path.join(
-            PROCESSED_MEDIA_DIR, f"{tv_style_filename}.mkv")
-        mkv_path = multiplex_to_mkv(
+        media['mkv'] = multiplex_to_mkv(
             output_video_path,
             output_audio_path,
-            output_mkv_path,
+            media['output_mkv'],
             subtitle_paths,
             title
         )
 
         # Create metadata
-        metadata_path = os.path.join(
-            PROCESSED_MEDIA_DIR, f"{tv_style_filename}_metadata.txt")
-        create_metadata_file(
-            metadata_path,
-            title,
-            season_number,
-            episode_tag,
-            output_audio_path,
-            output_video_path,
-            season_folder,
-            mkv_path,
-            subtitle_paths
-        )
+        write_media_metadata(media)
 
-        return {
-            'audio': output_audio_path,
-            'video': output_video_path,
-            'mkv': mkv_path,
-            'metadata': metadata_path,
-            'subtitles': subtitle_paths,
-            'quality': prefered_video_quality
-        }
+        return media
 
     except Exception as e:
         message.error(f"Error processing media files for {title}: {str(e)}")
         return None
 
 
+def write_media_metadata(media):
+    """
+    Write the metadata file for a processed episode.
+
+    Args:
+        media: Dictionary returned by process_media_files
+
+    Returns:
+        Path to the metadata file or None if creation failed
+    """
+    return create_metadata_file(
+        media['metadata'],
+        media['title'],
+        media['season_number'],
+        media['episode_tag'],
+        media['audio'],
+        media['video'],
+        media['source_folder'],
+        media['mkv'],
+        media['subtitles']
+    )
+
+
+def multiplex_media_batch(media_list):
+    """
+    Create the MKV and metadata files for several episodes at once.
+
+    Args:
+        media_list: List of dictionaries returned by process_media_files
+            with multiplex=False
+
+    Returns:
+        None
+    """
+    jobs = [
+        (media['video'], media['audio'], media['subtitles'],
+         media['output_mkv'], media['title'])
+        for media in media_list
+    ]
+
+    for media, mkv_path in zip(media_list, multiplex_batch(jobs)):
+        media['mkv'] = mkv_path
+        write_media_metadata(media)
+
+
 def is_valid_season_folder(folder_path):
     """
     Check if a folder is a valid anime season folder.
@@ -273,80 +517,61 @@ def is_valid_season_folder(folder_path):
     Returns:
         True if it's a valid season folder, False otherwise
     """
-    global _entry_info_cache
-
-    # Check for entry.json
-    entry_json_path = os.path.join(folder_path, ENTRY_JSON_FILENAME)
-    has_entry_json = os.path.exists(entry_json_path)
-
-    # Get info from entry.json if available, using cache
-    entry_info = None
-    if has_entry_json:
-        if entry_json_path in _entry_info_cache:
-            entry_info = _entry_info_cache[entry_json_path]
-        else:
-            entry_info = extract_info_from_entry_json(entry_json_path)
-            _entry_info_cache[entry_json_path] = entry_info
-
-    # Check for subtitle folder using the name from entry.json
-    has_subtitle_folder = False
-    if entry_info and entry_info.get('local_subtitle_folder'):
-        subtitle_folder = os.path.join(
-            folder_path, entry_info['local_subtitle_folder'])
-        has_subtitle_folder = os.path.exists(subtitle_folder)
-    else:
-        # Fallback to check common subtitle folder names
-        for common_folder in ['vi', 'subtitle', 'subtitles', 'sub', 'subs']:
-            if os.path.exists(os.path.join(folder_path, common_folder)):
-                has_subtitle_folder = True
-                break
+    # One directory read instead of a stat per candidate path
+    names = _scan(folder_path)
 
-    # Check for quality folders based on entry.json
-    has_media_folder = False
-    if entry_info and entry_info.get('prefered_video_quality'):
-        prefered_video_quality = entry_info.get('prefered_video_quality')
-        if os.path.exists(os.path.join(folder_path, prefered_video_quality)):
-            has_media_folder = True
+    # Any one sign is enough, so check the cheap ones first and stop early.
+    # entry.json alone qualifies the folder; it is parsed when it is processed
+    if ENTRY_JSON_FILENAME in names:
+        return True
 
-    # Check for any folder containing media files
-    if not has_media_folder:
-        for item in os.listdir(folder_path):
-            item_path = os.path.join(folder_path, item)
-            if os.path.isdir(item_path):
-                if (os.path.exists(os.path.join(item_path, AUDIO_FILENAME)) and
-                        os.path.exists(os.path.join(item_path, VIDEO_FILENAME))):
-                    has_media_folder = True
-                    break
+    # Without entry.json, check the common subtitle folder names
+    if not COMMON_SUBTITLE_FOLDERS.isdisjoint(names):
+        return True
 
-    return has_entry_json or has_media_folder or has_subtitle_folder
+    # Check for any folder containing media files, reusing the same listing
+    for subfolder in _subfolders(folder_path):
+        children = _scan(subfolder)
+        if AUDIO_FILENAME in children and VIDEO_FILENAME in children:
+            return True
+
+    return False
 
 
 def clear_entry_info_cache():
-    """Clear the entry.json info cache to free memory."""
-    global _entry_info_cache
-    _entry_info_cache.clear()
+    """Clear the entry.json info, directory listing and failed download caches."""
+    clear_entry_json_cache()
+    _scan.cache_clear()
+    _scan_entries.cache_clear()
+    _failed_en_subtitles.clear()
 
 
-def process_season_folder(season_folder, season_number=1):
+def process_season_folder(season_folder, season_number=1, multiplex=True,
+                          stage_media=False, reflink=False):
     """
     Process a single anime season folder.
 
     Args:
         season_folder: Path to the season folder
         season_number: Season number for TV style naming
+        multiplex: Create the MKV now (see process_media_files)
+        stage_media: Copy the audio/video files to the output folder
+        reflink: Make copy-on-write copies instead of hardlinks
 
     Returns:
-        True if processing was successful, False otherwise
+        Dictionary with paths to processed files or None if processing failed
     """
     message.season_processing(os.path.basename(season_folder))
 
     # Get season info - THIS IS NOW LOADED ONLY ONCE PER SEASON
-    entry_json_path = os.path.join(season_folder, ENTRY_JSON_FILENAME)
-    if not os.path.exists(entry_json_path):
+    # The folder listing is already cached from find_season_folders,
+    # so this check costs no extra stat
+    if ENTRY_JSON_FILENAME not in _scan(season_folder):
         message.file_not_found(ENTRY_JSON_FILENAME, season_folder)
-        return False
+        return None
+    entry_json_path = os.path.join(season_folder, ENTRY_JSON_FILENAME)
 
-    # Extract entry info once and reuse it
+    # Reuse the entry info parsed while finding the season folders
     entry_info = extract_info_from_entry_json(entry_json_path)
 
     # Format standard filename
@@ -358,51 +583,56 @@ def process_season_folder(season_folder, season_number=1):
     # Process all content with the shared entry_info
     download_en_subtitle(entry_info, season_number, tv_style_filename)
     process_local_subtitle(season_folder, entry_info,
-                           season_number, tv_style_filename)
-    process_media_files(season_folder, entry_info, season_number)
-
-    return True
+                           season_number, tv_style_filename, reflink)
+    return process_media_files(
+        season_folder, entry_info, season_number, multiplex, stage_media, reflink)
 
 
 def find_season_folders(parent_folder, max_depth=3, current_depth=0):
     """
-    Recursively find all valid season folders.
+    Find all valid season folders, searching up to max_depth levels deep.
 
     Args:
         parent_folder: Parent folder to start the search from
-        max_depth: Maximum recursion depth
-        current_depth: Current recursion depth
+        max_depth: Maximum search depth
+        current_depth: Depth of parent_folder itself
 
     Returns:
         List of valid season folder paths
     """
-    if current_depth > max_depth:
-        return []
-
     season_folders = []
 
-    # Get all subfolders
-    subfolders = [os.path.join(parent_folder, f) for f in os.listdir(parent_folder)
-                  if os.path.isdir(os.path.join(parent_folder, f))]
-
-    for folder in subfolders:
-        if is_valid_season_folder(folder):
-            season_folders.append(folder)
-        else:
-            # If not a valid season folder, search inside it
-            season_folders.extend(find_season_folders(
-                folder, max_depth, current_depth + 1))
+    # Breadth-first queue of (folder, depth) instead of recursion
+    queue = deque([(parent_folder, current_depth)])
+    while queue:
+        folder, depth = queue.popleft()
+        if depth > max_depth:
+            continue
+
+        # The listing is cached, so is_valid_season_folder already read
+        # every subfolder queued here and it is not read again
+        for subfolder in _subfolders(folder):
+            if is_valid_season_folder(subfolder):
+                # Season folders are not searched any deeper
+                season_folders.append(subfolder)
+            else:
+                # If not a valid season folder, search inside it
+                queue.append((subfolder, depth + 1))
 
     return season_folders
 
 
-def process_all_seasons(bilibili_folder, season_number=1):
+def process_all_seasons(bilibili_folder, season_number=1, max_workers=SEASON_WORKERS,
+                        stage_media=False, reflink=False):
     """
     Process all anime seasons in the bilibili_video folder.
 
     Args:
         bilibili_folder: Path to the bilibili_video folder
         season_number: Season number for TV style naming
+        max_workers: Maximum number of season folders prepared at once
+        stage_media: Copy the audio/video files to the output folder
+        reflink: Make copy-on-write copies instead of hardlinks
 
     Returns:
         None
@@ -419,11 +649,25 @@ def process_all_seasons(bilibili_folder, season_number=1):
             f"No valid anime season folders found in {bilibili_folder}")
         return
 
-    message.info(f"Found {len(season_folders)} anime season folders")
-
-    # Process each season folder
-    for season_folder in season_folders:
-        process_season_folder(season_folder, season_number)
+    message.info("Found %d anime season folders", len(season_folders))
+
+    # Fetch all English subtitles up front so the network waits overlap
+    prefetch_en_subtitles(season_folders, season_number)
+
+    # Prepare the season folders concurrently (subtitle downloads and file
+    # copies are I/O bound)
+    prepare = partial(
+        process_season_folder, season_number=season_number, multiplex=False,
+        stage_media=stage_media, reflink=reflink)
+    workers = max(1, min(max_workers, len(season_folders)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        prepared = list(executor.map(prepare, season_folders))
+
+    # Multiplex every episode in one go so the batches can span seasons and
+    # keep all mux workers busy, using as few ffmpeg processes as possible
+    media_list = [media for media in prepared if media]
+    if media_list:
+        multiplex_media_batch(media_list)
 
 
 def get_season_number():
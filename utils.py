@@ -1,21 +1,94 @@
 import os
+import asyncio
+import codecs
+import errno
 import json
 import re
-import math
 import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 import requests
-from config import DEFAULT_ENCODING
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson  # Optional, several times faster than json for large files
+except ImportError:
+    orjson = None
+
+from config import (
+    DEFAULT_ENCODING, DOWNLOAD_CHUNK_SIZE, DOWNLOAD_CONCURRENCY, DOWNLOAD_TIMEOUT
+)
+import message
+
+
+# Shared session so downloads reuse pooled keep-alive connections
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.3)
+)
+_SESSION.mount('https://', _ADAPTER)
+_SESSION.mount('http://', _ADAPTER)
+
+
+# Episode number inside an episode tag such as "12" or "EP12"
+_EPISODE_NUM_RE = re.compile(r'\d+')
+
+class _SafeCharTable(dict):
+    """
+    str.translate table that keeps letters, digits (in any script), spaces,
+    '_' and '-' and deletes everything else.
+
+    Entries are filled in on first use, so only the characters that actually
+    appear in titles are ever looked up in Python.
+    """
+
+    def __missing__(self, codepoint):
+        char = chr(codepoint)
+        value = codepoint if char.isalnum() or char in ' _-' else None
+        self[codepoint] = value
+        return value
+
+
+_SAFE_CHARS = _SafeCharTable()
+
+
+def get_session():
+    """Get the shared requests session used for downloads."""
+    return _SESSION
+
+
+def parse_json(data, encoding=DEFAULT_ENCODING):
+    """
+    Parse JSON from raw bytes, using the optional orjson package when it can.
+
+    Args:
+        data: The file contents as bytes
+        encoding: Text encoding of the data
+
+    Returns:
+        The parsed JSON value
+    """
+    # orjson only reads UTF-8
+    if orjson is not None and codecs.lookup(encoding).name == 'utf-8':
+        return orjson.loads(data)
+    return json.loads(data.decode(encoding))
 
 
 def load_json(file_path, encoding=DEFAULT_ENCODING):
     """Load JSON data from a file."""
     try:
-        with open(file_path, 'r', encoding=encoding) as file:
-            return json.load(file)
+        with open(file_path, 'rb') as file:
+            return parse_json(file.read(), encoding)
     except FileNotFoundError:
         return {}
     except json.JSONDecodeError:
-        print(f"Error: Invalid JSON format in {file_path}")
+        message.error(f"Invalid JSON format in {file_path}")
         return {}
 
 
@@ -33,31 +106,113 @@ def write_file(file_path, content, encoding=DEFAULT_ENCODING):
 
 def ensure_dir_exists(directory):
     """Ensure that a directory exists, creating it if necessary."""
-    if not os.path.exists(directory):
-        os.makedirs(directory)
+    # exist_ok avoids a race when several seasons create the folder at once
+    os.makedirs(directory, exist_ok=True)
 
 
 def format_srt_time(seconds):
     """Format a time in seconds to SRT format (HH:MM:SS,MS)."""
-    hour = math.floor(seconds) // 3600
-    minute = (math.floor(seconds) - hour * 3600) // 60
-    sec = math.floor(seconds) - hour * 3600 - minute * 60
-    min_sec = int(math.modf(seconds)[0] * 100)
+    whole = int(seconds)
+    min_sec = int((seconds - whole) * 100)
+    hour, remainder = divmod(whole, 3600)
+    minute, sec = divmod(remainder, 60)
+
+    return f"{hour:02d}:{minute:02d}:{sec:02d},{min_sec:02d}"
+
+
+@contextmanager
+def _open_partial(save_path):
+    """
+    Open a temporary file that replaces save_path once it is fully written.
 
-    return f"{str(hour).zfill(2)}:{str(minute).zfill(2)}:{str(sec).zfill(2)},{str(min_sec).zfill(2)}"
+    An interrupted download is never mistaken for a finished one on the
+    next run: on any error the temporary file is removed instead.
+
+    Args:
+        save_path: Final path of the file
+
+    Yields:
+        The temporary file, opened for binary writing
+    """
+    partial_path = save_path + '.part'
+    try:
+        with open(partial_path, 'wb') as file:
+            yield file
+        os.replace(partial_path, save_path)
+    except BaseException:
+        try:
+            os.remove(partial_path)
+        except OSError:
+            pass
+        raise
 
 
 def download_file(url, save_path):
     """Download a file from a URL and save it to the specified path."""
     try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            with open(save_path, 'wb') as file:
-                file.write(response.content)
-            return save_path
+        # Stream the body to disk instead of holding it all in memory
+        with _SESSION.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+            if response.status_code != 200:
+                return None
+            response.raw.decode_content = True
+            with _open_partial(save_path) as file:
+                shutil.copyfileobj(response.raw, file, DOWNLOAD_CHUNK_SIZE)
+        return save_path
+    except Exception as e:
+        message.error(f"Error downloading {url}: {str(e)}")
         return None
+
+
+def download_files(downloads, max_concurrent=DOWNLOAD_CONCURRENCY):
+    """
+    Download several files at once.
+
+    Uses the optional aiohttp package to run every request on one event
+    loop; without it the downloads run on a thread pool through the
+    shared requests session.
+
+    Args:
+        downloads: List of (url, save_path) tuples
+        max_concurrent: Maximum number of requests in flight
+
+    Returns:
+        List with the saved path (or None on failure) for each download, in order
+    """
+    if not downloads:
+        return []
+
+    try:
+        import aiohttp  # noqa: F401
+    except ImportError:
+        with ThreadPoolExecutor(max_workers=min(max_concurrent, len(downloads))) as executor:
+            return list(executor.map(lambda item: download_file(*item), downloads))
+
+    return asyncio.run(_download_files_async(downloads, max_concurrent))
+
+
+async def _download_files_async(downloads, max_concurrent):
+    """Download (url, save_path) pairs concurrently with aiohttp."""
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(limit=max_concurrent)
+    timeout = aiohttp.ClientTimeout(total=DOWNLOAD_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        return await asyncio.gather(*(
+            _fetch(session, url, save_path) for url, save_path in downloads))
+
+
+async def _fetch(session, url, save_path):
+    """Stream one URL to save_path, returning the path or None on failure."""
+    try:
+        async with session.get(url) as response:
+            if response.status != 200:
+                return None
+            with _open_partial(save_path) as file:
+                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    file.write(chunk)
+        return save_path
     except Exception as e:
-        print(f"Error downloading {url}: {str(e)}")
+        message.error(f"Error downloading {url}: {str(e)}")
         return None
 
 
@@ -73,8 +228,7 @@ def create_safe_filename(title):
     """
     if not title:
         return "Unknown"
-    safe_title = "".join(c for c in title if c.isalnum()
-                         or c in (' ', '_', '-')).strip()
+    safe_title = title.translate(_SAFE_CHARS).strip()
     # safe_title = safe_title.replace(' ', '_')
     return safe_title
 
@@ -83,12 +237,30 @@ def extract_info_from_entry_json(entry_json_path):
     """
     Extract useful information from an entry.json file.
 
+    Each file is parsed once; later calls are served from a cache keyed by
+    path and modification time, so an edited file is read again.
+
     Args:
         entry_json_path: Path to the entry.json file
 
     Returns:
-        Dictionary containing extracted information
+        Dictionary containing extracted information (a copy the caller may modify)
     """
+    try:
+        mtime = os.path.getmtime(entry_json_path)
+    except OSError:
+        mtime = None
+    return dict(_extract_cached(entry_json_path, mtime))
+
+
+def clear_entry_json_cache():
+    """Clear the cache used by extract_info_from_entry_json."""
+    _extract_cached.cache_clear()
+
+
+@lru_cache(maxsize=1024)
+def _extract_cached(entry_json_path, mtime):
+    """Parse an entry.json file; mtime is only part of the cache key (None if missing)."""
     info = {
         # Default to folder name
         'title': os.path.basename(os.path.dirname(entry_json_path)),
@@ -99,7 +271,7 @@ def extract_info_from_entry_json(entry_json_path):
         'prefered_video_quality': ''
     }
 
-    if not os.path.exists(entry_json_path):
+    if mtime is None:
         return info
 
     try:
@@ -139,7 +311,7 @@ def extract_info_from_entry_json(entry_json_path):
                 data['prefered_video_quality'])
 
     except Exception as e:
-        print(f"Error reading entry.json: {str(e)}")
+        message.error(f"Error reading entry.json: {str(e)}")
 
     return info
 
@@ -166,7 +338,7 @@ def format_tv_style_filename(title, season_number, episode_number):
             formatted_episode = f"E{episode_number:02d}"
         else:
             # Try to extract a number from the episode tag
-            match = re.search(r'\d+', str(episode_number))
+            match = _EPISODE_NUM_RE.search(str(episode_number))
             if match:
                 ep_num = int(match.group())
                 formatted_episode = f"E{ep_num:02d}"
@@ -179,14 +351,159 @@ def format_tv_style_filename(title, season_number, episode_number):
     return f"{safe_title} - {formatted_season}{formatted_episode}"
 
 
-def copy_file_with_new_name(source_path, dest_dir, new_filename):
+# GNU cp falls back to a normal copy by itself; BSD cp on macOS has no
+# --reflink and clones with -c instead (APFS), failing if it can't
+_REFLINK_CP_ARGS = ['cp', '-c'] if sys.platform == 'darwin' else ['cp', '--reflink=auto']
+
+
+def _reflink_copy(source_path, dest_path):
+    """Make a copy-on-write copy of a file with cp, returning True on success."""
+    try:
+        result = subprocess.run(
+            [*_REFLINK_CP_ARGS, source_path, dest_path],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+    except OSError:
+        return False
+    return result.returncode == 0
+
+
+# Errors from os.link/os.replace that mean "copy the data instead"
+_COPY_FALLBACK_ERRNOS = frozenset(
+    code for code in (
+        errno.EXDEV,  # Different filesystem
+        errno.EPERM,  # Filesystem doesn't allow links (FAT, some network shares)
+        errno.EACCES,
+        errno.EMLINK,  # Too many links to the source
+        errno.EINVAL,
+        getattr(errno, 'ENOTSUP', None),
+        getattr(errno, 'EOPNOTSUPP', None),
+    ) if code is not None
+)
+
+
+# Bytes compared at each end of a file by _files_equal
+SAME_FILE_CHECK_SIZE = 64 * 1024
+
+# copy_file_range needs Linux 4.5+ and Python 3.8+
+_HAS_COPY_FILE_RANGE = sys.platform == 'linux' and hasattr(os, 'copy_file_range')
+COPY_FILE_RANGE_CHUNK_SIZE = 64 * 1024 * 1024
+
+
+def _hardlink(source_path, dest_path):
+    """Hardlink a file, returning True if dest_path now is the source file."""
+    try:
+        os.link(source_path, dest_path)
+        return True
+    except FileExistsError:
+        # Already linked by an earlier run
+        return os.path.samefile(source_path, dest_path)
+    except OSError as e:
+        if e.errno in _COPY_FALLBACK_ERRNOS:
+            return False
+        raise
+
+
+def _move(source_path, dest_path):
+    """Rename a file, returning False if it has to be copied instead."""
+    try:
+        os.replace(source_path, dest_path)
+        return True
+    except OSError as e:
+        if e.errno in _COPY_FALLBACK_ERRNOS:
+            return False
+        raise
+
+
+def _files_equal(source_path, dest_path):
+    """
+    Quickly check whether dest_path already holds a copy of source_path.
+
+    Compares the sizes and then the first and last SAME_FILE_CHECK_SIZE
+    bytes, which is enough to recognise a finished copy of the same media
+    file without reading all of it.
+
+    Returns:
+        True if the files look identical, False otherwise (or if dest is missing)
+    """
+    try:
+        size = os.path.getsize(source_path)
+        if os.path.getsize(dest_path) != size:
+            return False
+        with open(source_path, 'rb') as source, open(dest_path, 'rb') as dest:
+            if source.read(SAME_FILE_CHECK_SIZE) != dest.read(SAME_FILE_CHECK_SIZE):
+                return False
+            if size > SAME_FILE_CHECK_SIZE:
+                tail = max(size - SAME_FILE_CHECK_SIZE, SAME_FILE_CHECK_SIZE)
+                source.seek(tail)
+                dest.seek(tail)
+                return source.read() == dest.read()
+            return True
+    except OSError:
+        return False
+
+
+def _copy_file_range(source_path, dest_path):
+    """
+    Copy a file inside the kernel with copy_file_range (Linux only).
+
+    Unlike sendfile, this lets btrfs/XFS share the extents (a reflink) and
+    NFS/SMB copy on the server side.
+
+    Returns:
+        True if the whole file was copied, False if the caller should fall
+        back to shutil.copyfile
+    """
+    if not _HAS_COPY_FILE_RANGE:
+        return False
+
+    with open(source_path, 'rb') as source:
+        source_stat = os.fstat(source.fileno())
+        # Open without truncating, so a link to the source isn't emptied
+        dest_fd = os.open(dest_path, os.O_WRONLY | os.O_CREAT, 0o666)
+        with open(dest_fd, 'wb') as dest:
+            dest_stat = os.fstat(dest_fd)
+            if (source_stat.st_dev, source_stat.st_ino) == (dest_stat.st_dev, dest_stat.st_ino):
+                raise shutil.SameFileError(
+                    f"{source_path!r} and {dest_path!r} are the same file")
+            os.ftruncate(dest_fd, 0)
+
+            copied = 0
+            try:
+                while True:
+                    count = os.copy_file_range(
+                        source.fileno(), dest_fd, COPY_FILE_RANGE_CHUNK_SIZE)
+                    if not count:
+                        break
+                    copied += count
+            except OSError:
+                # Old kernel or filesystem without support (ENOSYS, EXDEV, ...)
+                return False
+    # Some filesystems (FUSE, procfs-like files) report 0 bytes copied
+    # straight away, so only trust a copy of the whole file
+    return copied == source_stat.st_size
+
+
+def copy_file_with_new_name(source_path, dest_dir, new_filename,
+                            prefer_link=True, move=False, reflink=False):
     """
     Copy a file to a destination with a new filename.
 
+    The file is hardlinked when possible, since it is only read afterwards,
+    so no data has to be copied. With reflink set, a copy-on-write
+    copy is made with cp instead. Otherwise it falls back to
+    shutil.copyfile, which uses the kernel's zero-copy path where available.
+
     Args:
         source_path: Path to the source file
         dest_dir: Destination directory
         new_filename: New filename (without directory path)
+        prefer_link: Try a hardlink before copying; pass False when the
+            new file must be independent of the source
+        move: The source may be consumed, so rename it instead of copying
+            when both paths are on the same filesystem
+        reflink: Make a copy-on-write copy instead of a hardlink
 
     Returns:
         Path to the new file or None if copy failed
@@ -195,10 +512,34 @@ def copy_file_with_new_name(source_path, dest_dir, new_filename):
     dest_path = os.path.join(dest_dir, new_filename)
 
     try:
-        shutil.copy2(source_path, dest_path)
+        if move:
+            if not _move(source_path, dest_path):
+                shutil.move(source_path, dest_path)
+            return dest_path
+
+        # Nothing to do when an earlier run already copied this file
+        if _files_equal(source_path, dest_path):
+            return dest_path
+
+        if reflink:
+            if _reflink_copy(source_path, dest_path):
+                return dest_path
+        elif prefer_link and _hardlink(source_path, dest_path):
+            return dest_path
+
+        # copyfile uses sendfile/fcopyfile; the timestamps are only nice to have
+        if not _copy_file_range(source_path, dest_path):
+            shutil.copyfile(source_path, dest_path)
+        try:
+            shutil.copystat(source_path, dest_path)
+        except OSError:
+            pass
+        return dest_path
+    except shutil.SameFileError:
+        # Hardlinked by an earlier run
         return dest_path
     except Exception as e:
-        print(f"Error copying {source_path} to {dest_path}: {str(e)}")
+        message.error(f"Error copying {source_path} to {dest_path}: {str(e)}")
         return None
 
 
@@ -223,23 +564,27 @@ def create_metadata_file(output_path, title, season_number, episode_tag,
         Path to the metadata file or None if creation failed
     """
     try:
-        with open(output_path, 'w', encoding=DEFAULT_ENCODING) as f:
-            f.write(f"Title: {title}\n")
-            f.write(f"Season: {season_number}\n")
-            f.write(f"Episode: {episode_tag}\n")
-            f.write(f"Audio file: {audio_path}\n")
-            f.write(f"Video file: {video_path}\n")
+        lines = [
+            f"Title: {title}\n",
+            f"Season: {season_number}\n",
+            f"Episode: {episode_tag}\n",
+            f"Audio file: {audio_path}\n",
+            f"Video file: {video_path}\n",
+        ]
 
-            if mkv_path:
-                f.write(f"MKV file: {mkv_path}\n")
+        if mkv_path:
+            lines.append(f"MKV file: {mkv_path}\n")
 
-            if subtitle_paths and isinstance(subtitle_paths, dict):
-                f.write("Subtitles:\n")
-                for lang, path in subtitle_paths.items():
-                    f.write(f"  {lang}: {path}\n")
+        if subtitle_paths and isinstance(subtitle_paths, dict):
+            lines.append("Subtitles:\n")
+            lines.extend(f"  {lang}: {path}\n" for lang, path in subtitle_paths.items())
 
-            f.write(f"Original folder: {source_folder}\n")
+        lines.append(f"Original folder: {source_folder}\n")
+
+        # Write the whole file at once
+        with open(output_path, 'w', encoding=DEFAULT_ENCODING) as f:
+            f.write("".join(lines))
         return output_path
     except Exception as e:
-        print(f"Error creating metadata file {output_path}: {str(e)}")
+        message.error(f"Error creating metadata file {output_path}: {str(e)}")
         return None